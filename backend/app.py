@@ -1,27 +1,95 @@
+import importlib
 from flask import Flask
 from flask_cors import CORS
-from routes import auth, products, cart, order, admin
 from utils.db import initialize_db
+from utils.cart_store import initialize_cart_store
+from utils.compression import initialize_compression
+from utils.archive import initialize_archive
+from utils.order_events import initialize_order_events
+from utils.analytics import initialize_analytics
+from utils.payment_events import initialize_payment_events
 
-app = Flask(__name__)
-CORS(app)
+# Blueprint modules are imported by name while the app is created. This
+# makes registration selective (a worker only loads the route modules, and
+# their dependencies, listed in ENABLED_BLUEPRINTS), not lazy: every enabled
+# module is still imported by create_app().
+BLUEPRINTS = {
+    'auth': ('routes.auth', '/api/auth'),
+    'products': ('routes.products', '/api/products'),
+    'cart': ('routes.cart', '/api/cart'),
+    'orders': ('routes.order', '/api/orders'),
+    'admin': ('routes.admin', '/api/admin'),
+    'batch': ('routes.batch', '/api/batch'),
+    'webhooks': ('routes.webhooks', '/api/webhooks')
+}
 
-# Load configuration
-app.config.from_pyfile('config.py')
 
-# Initialize database
-initialize_db(app)
+def register_blueprints(app):
+    """Import and register the blueprints enabled in ENABLED_BLUEPRINTS.
 
-# Register blueprints
-app.register_blueprint(auth.bp, url_prefix='/api/auth')
-app.register_blueprint(products.bp, url_prefix='/api/products')
-app.register_blueprint(cart.bp, url_prefix='/api/cart')
-app.register_blueprint(order.bp, url_prefix='/api/orders')
-app.register_blueprint(admin.bp, url_prefix='/api/admin')
+    Enabled modules are imported eagerly here; only disabled ones are
+    skipped.
+    """
+    enabled = app.config.get('ENABLED_BLUEPRINTS') or list(BLUEPRINTS)
+    for name in enabled:
+        module_name, url_prefix = BLUEPRINTS[name]
+        module = importlib.import_module(module_name)
+        app.register_blueprint(module.bp, url_prefix=url_prefix)
+
+
+def preload_dependencies():
+    """Import deferred heavy dependencies up front.
+
+    Used with forking servers (e.g. gunicorn --preload) so modules are
+    imported once in the master and shared copy-on-write by workers.
+    """
+    from utils import razorpay_utils
+    razorpay_utils.preload()
+
+
+def create_app(config_overrides=None):
+    """Create and configure the Flask application"""
+    app = Flask(__name__)
+    CORS(app)
+
+    # Load configuration
+    app.config.from_pyfile('config.py')
+    if config_overrides:
+        app.config.update(config_overrides)
+
+    # Initialize database
+    initialize_db(app)
+
+    # Initialize cart store
+    initialize_cart_store(app)
+
+    # Initialize response compression
+    initialize_compression(app)
+
+    # Register order archival commands
+    initialize_archive(app)
+
+    # Initialize order status events
+    initialize_order_events(app)
+
+    # Register sales rollup commands
+    initialize_analytics(app)
+
+    # Register payment event worker command
+    initialize_payment_events(app)
+
+    # Register blueprints
+    register_blueprints(app)
+
+    if app.config.get('PRELOAD'):
+        preload_dependencies()
+
+    @app.route('/')
+    def hello():
+        return {"message": "Welcome to T-Shirt Design API"}
+
+    return app
 
-@app.route('/')
-def hello():
-    return {"message": "Welcome to T-Shirt Design API"}
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
@@ -0,0 +1,68 @@
+"""Compare MongoDB write counts for the direct and cached cart stores.
+
+Run from the backend directory:
+
+    python -m benchmarks.cart_write_amplification --users 200 --ops 20
+"""
+import argparse
+import random
+import time
+from utils.cart_store import DirectCartStore, CachedCartStore
+
+
+class CountingCollection:
+    """Minimal in-memory stand-in for the carts collection that counts writes"""
+
+    def __init__(self):
+        self.docs = {}
+        self.reads = 0
+        self.writes = 0
+
+    def find_one(self, query):
+        self.reads += 1
+        doc = self.docs.get(query['userId'])
+        return dict(doc) if doc else None
+
+    def update_one(self, query, update, upsert=False):
+        self.writes += 1
+        doc = self.docs.setdefault(query['userId'], {'userId': query['userId']})
+        doc.update(update.get('$set', {}))
+        for key, value in update.get('$setOnInsert', {}).items():
+            doc.setdefault(key, value)
+
+
+def run(store, users, ops, seed):
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for _ in range(users * ops):
+        user_id = f"user{rng.randrange(users)}"
+        cart = store.get(user_id) or {'userId': user_id, 'items': []}
+        cart['items'].append({'productId': str(rng.randrange(50)), 'quantity': 1})
+        store.save(cart)
+    store.flush()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--ops', type=int, default=20, help='cart writes per user')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    direct = CountingCollection()
+    direct_time = run(DirectCartStore(lambda: direct), args.users, args.ops, args.seed)
+
+    cached = CountingCollection()
+    cached_time = run(CachedCartStore(cached), args.users, args.ops, args.seed)
+
+    mutations = args.users * args.ops
+    print(f"cart mutations: {mutations}")
+    print(f"direct: {direct.writes} writes, {direct.reads} reads, "
+          f"{direct.writes / mutations:.2f} writes/mutation, {direct_time:.3f}s")
+    print(f"cached: {cached.writes} writes, {cached.reads} reads, "
+          f"{cached.writes / mutations:.2f} writes/mutation, {cached_time:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Report per-module import cost of the application at startup.
+
+Runs ``python -X importtime`` in a fresh interpreter and aggregates the
+cumulative time by top-level package. Run from the backend directory:
+
+    python -m benchmarks.import_profile --top 20
+    python -m benchmarks.import_profile --target "from app import preload_dependencies; preload_dependencies()"
+"""
+import argparse
+import subprocess
+import sys
+from collections import defaultdict
+
+
+def profile(target):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', target],
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(result.returncode)
+
+    modules = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', default='import wsgi', help='code to profile')
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    modules = profile(args.target)
+
+    # Self time summed per top-level package
+    packages = defaultdict(int)
+    for name, self_us, _ in modules:
+        packages[name.strip().split('.')[0]] += self_us
+    total_us = sum(packages.values())
+
+    print(f"total import time: {total_us / 1000:.1f} ms across {len(modules)} modules\n")
+    print("by package (self time):")
+    for package, self_us in sorted(packages.items(), key=lambda p: -p[1])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {100 * self_us / total_us:5.1f}%  {package}")
+
+    print("\nslowest modules (cumulative time):")
+    for name, _, cumulative_us in sorted(modules, key=lambda m: -m[2])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name.strip()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Replay bursts of signed Razorpay webhook events against the API.
+
+Acts as a local stand-in for the payment gateway: it signs events with the
+webhook secret, re-sends a share of them (as Razorpay does on retries) and
+shuffles delivery order. Run from the backend directory with the API up:
+
+    python -m benchmarks.webhook_replay --url http://localhost:5000/api/webhooks/razorpay \\
+        --secret your_razorpay_webhook_secret --orders 500 --concurrency 32
+
+Pass real Razorpay order IDs with --order-ids to have the payment worker
+mark those orders paid; synthetic IDs exercise ingestion only.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import random
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+def build_events(order_ids, rng):
+    events = []
+    for order_id in order_ids:
+        payment = {'id': f"pay_{rng.getrandbits(48):x}", 'order_id': order_id, 'status': 'captured'}
+        created_at = int(time.time())
+        for offset, event in enumerate(['payment.authorized', 'payment.captured', 'order.paid']):
+            payload = {
+                'entity': 'event',
+                'event': event,
+                'payload': {'payment': {'entity': payment}},
+                'created_at': created_at + offset
+            }
+            if event == 'order.paid':
+                payload['payload']['order'] = {'entity': {'id': order_id, 'status': 'paid'}}
+            events.append((f"evt_{rng.getrandbits(64):x}", json.dumps(payload).encode()))
+    return events
+
+
+def send(url, secret, event_id, body):
+    signature = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    req = urllib.request.Request(url, data=body, method='POST', headers={
+        'Content-Type': 'application/json',
+        'X-Razorpay-Signature': signature,
+        'X-Razorpay-Event-Id': event_id
+    })
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except urllib.error.URLError:
+        status = 'error'
+    return status, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:5000/api/webhooks/razorpay')
+    parser.add_argument('--secret', required=True)
+    parser.add_argument('--orders', type=int, default=200, help='synthetic orders to generate')
+    parser.add_argument('--order-ids', help='file with one Razorpay order ID per line')
+    parser.add_argument('--duplicate-rate', type=float, default=0.2, help='share of events delivered twice')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.order_ids:
+        with open(args.order_ids) as f:
+            order_ids = [line.strip() for line in f if line.strip()]
+    else:
+        order_ids = [f"order_bench_{i}" for i in range(args.orders)]
+
+    events = build_events(order_ids, rng)
+    deliveries = events + [event for event in events if rng.random() < args.duplicate_rate]
+    rng.shuffle(deliveries)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda event: send(args.url, args.secret, *event), deliveries))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for _, latency in results)
+    statuses = Counter(status for status, _ in results)
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+    print(f"deliveries: {len(deliveries)} ({len(events)} unique events, {len(order_ids)} orders)")
+    print(f"throughput: {len(deliveries) / elapsed:.1f} events/s over {elapsed:.2f}s")
+    print(f"latency: p50 {percentile(0.5):.1f} ms, p95 {percentile(0.95):.1f} ms, p99 {percentile(0.99):.1f} ms")
+    print(f"statuses: {dict(statuses)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,63 @@
 import os
-from decouple import config
+from decouple import config, Csv
 
 # Flask settings
 SECRET_KEY = config('SECRET_KEY', default='your-secret-key')
 DEBUG = config('DEBUG', default=True, cast=bool)
 
+# Startup settings: blueprints to register (all when empty; enabled ones
+# are imported when the app is created, disabled ones never) and whether to
+# import deferred dependencies up front for forking servers
+ENABLED_BLUEPRINTS = config('ENABLED_BLUEPRINTS', default='', cast=Csv())
+PRELOAD = config('PRELOAD', default=False, cast=bool)
+
 # MongoDB settings
 MONGO_URI = config('MONGO_URI', default='mongodb://localhost:27017/tshirt_store')
 
+# Query routing: catalog and analytics reads prefer secondaries no more
+# than DB_MAX_STALENESS_SECONDS (min 90) behind; per-route MongoDB time
+# limits in seconds (0 disables)
+DB_MAX_STALENESS_SECONDS = config('DB_MAX_STALENESS_SECONDS', default=90, cast=int)
+CATALOG_QUERY_TIMEOUT = config('CATALOG_QUERY_TIMEOUT', default=2.0, cast=float)
+ADMIN_QUERY_TIMEOUT = config('ADMIN_QUERY_TIMEOUT', default=15.0, cast=float)
+CHECKOUT_QUERY_TIMEOUT = config('CHECKOUT_QUERY_TIMEOUT', default=10.0, cast=float)
+
+# Number of web worker processes (also read by gunicorn)
+WEB_CONCURRENCY = config('WEB_CONCURRENCY', default=1, cast=int)
+
+# Cart cache settings (write-behind in-memory cart store). The cache is
+# per-process, so it must only be enabled with a single web worker, and
+# the worker count must be set through WEB_CONCURRENCY: the startup check
+# can't see counts passed any other way (e.g. gunicorn -w 4). When
+# CART_JOURNAL_PATH is set, a second worker on the same host fails on its
+# first cart request instead of silently corrupting carts
+CART_CACHE_ENABLED = config('CART_CACHE_ENABLED', default=False, cast=bool)
+CART_FLUSH_INTERVAL = config('CART_FLUSH_INTERVAL', default=5.0, cast=float)
+CART_JOURNAL_PATH = config('CART_JOURNAL_PATH', default='')
+
+# HTTP caching for public catalog endpoints (seconds)
+CATALOG_CACHE_MAX_AGE = config('CATALOG_CACHE_MAX_AGE', default=60, cast=int)
+
+# Response compression (brotli/zstd are used when installed, gzip always)
+COMPRESS_ENABLED = config('COMPRESS_ENABLED', default=True, cast=bool)
+COMPRESS_MIN_SIZE = config('COMPRESS_MIN_SIZE', default=500, cast=int)
+COMPRESS_LEVEL = config('COMPRESS_LEVEL', default=6, cast=int)
+COMPRESS_CACHE_ENTRIES = config('COMPRESS_CACHE_ENTRIES', default=256, cast=int)
+
+# Order archival (delivered/cancelled orders move to orders_archive)
+ORDER_ARCHIVE_AFTER_DAYS = config('ORDER_ARCHIVE_AFTER_DAYS', default=90, cast=int)
+ORDER_ARCHIVE_BATCH_SIZE = config('ORDER_ARCHIVE_BATCH_SIZE', default=500, cast=int)
+
+# Batch API limits
+MAX_BATCH_IDS = config('MAX_BATCH_IDS', default=100, cast=int)
+MAX_BATCH_REQUESTS = config('MAX_BATCH_REQUESTS', default=10, cast=int)
+
+# Order status event streams: 'local' publishes in-process, 'changestream'
+# reads status changes from MongoDB (replica set) so all workers see them
+ORDER_EVENTS_BACKEND = config('ORDER_EVENTS_BACKEND', default='local')
+ORDER_EVENTS_QUEUE_SIZE = config('ORDER_EVENTS_QUEUE_SIZE', default=100, cast=int)
+ORDER_EVENTS_HEARTBEAT = config('ORDER_EVENTS_HEARTBEAT', default=15, cast=int)
+
 # JWT settings
 JWT_SECRET_KEY = config('JWT_SECRET_KEY', default='jwt-secret-key')
 JWT_ACCESS_TOKEN_EXPIRES = 3600 * 24  # 24 hours
@@ -15,6 +65,17 @@ JWT_ACCESS_TOKEN_EXPIRES = 3600 * 24  # 24 hours
 # Razorpay settings
 RAZORPAY_KEY_ID = config('RAZORPAY_KEY_ID', default='your-razorpay-key-id')
 RAZORPAY_KEY_SECRET = config('RAZORPAY_KEY_SECRET', default='your-razorpay-key-secret')
+RAZORPAY_WEBHOOK_SECRET = config('RAZORPAY_WEBHOOK_SECRET', default='')
+
+# Payment event worker (applies stored webhook events to orders). It runs
+# as a separate process, so it requires CART_CACHE_ENABLED=False and
+# ORDER_EVENTS_BACKEND=changestream
+PAYMENT_WORKER_BATCH_SIZE = config('PAYMENT_WORKER_BATCH_SIZE', default=200, cast=int)
+PAYMENT_WORKER_THREADS = config('PAYMENT_WORKER_THREADS', default=4, cast=int)
+PAYMENT_WORKER_POLL_INTERVAL = config('PAYMENT_WORKER_POLL_INTERVAL', default=1.0, cast=float)
+PAYMENT_WORKER_MAX_ATTEMPTS = config('PAYMENT_WORKER_MAX_ATTEMPTS', default=10, cast=int)
+PAYMENT_WORKER_RETRY_BACKOFF = config('PAYMENT_WORKER_RETRY_BACKOFF', default=5.0, cast=float)
+PAYMENT_WORKER_MAX_BACKOFF = config('PAYMENT_WORKER_MAX_BACKOFF', default=3600.0, cast=float)
 
 # Upload folder
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
@@ -1,13 +1,18 @@
 from flask import Blueprint, request, jsonify
+from pymongo import ReturnDocument
 from bson.objectid import ObjectId
-from utils.db import get_db
+from utils.db import get_db, db_timeout
 from utils.auth_middleware import admin_required
+from utils.archive import find_orders, count_orders, update_order
+from utils.order_events import publish_order_status
+from utils.analytics import record_status_change, get_sales_series, GRANULARITIES, BREAKDOWNS
 import datetime
 
 bp = Blueprint('admin', __name__)
 
 @bp.route('/orders', methods=['GET'])
 @admin_required
+@db_timeout('ADMIN_QUERY_TIMEOUT')
 def admin_get_orders(current_user):
     # Pagination
     page = int(request.args.get('page', 1))
@@ -20,14 +25,10 @@ def admin_get_orders(current_user):
     if status:
         query['status'] = status
     
-    # Get all orders
-    orders = list(get_db().orders
-        .find(query)
-        .sort('createdAt', -1)
-        .skip(skip)
-        .limit(limit))
+    # Get all orders (including archived ones)
+    orders = find_orders(query, skip, limit, intent='analytics')
     
-    total = get_db().orders.count_documents(query)
+    total = count_orders(query, intent='analytics')
     
     # Convert ObjectId to string
     for order in orders:
@@ -51,23 +52,33 @@ def update_order_status(current_user, order_id):
         return jsonify({'message': 'Status is required!'}), 400
     
     # Update order status
-    result = get_db().orders.update_one(
+    updated_at = datetime.datetime.utcnow()
+    order = update_order(
         {'_id': ObjectId(order_id)},
         {
             '$set': {
                 'status': status,
-                'updatedAt': datetime.datetime.utcnow()
+                'updatedAt': updated_at
             }
-        }
+        },
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.matched_count == 0:
+    if not order:
         return jsonify({'message': 'Order not found!'}), 404
     
+    old_status = order['status']
+    order['status'] = status
+    order['updatedAt'] = updated_at
+    
+    record_status_change(order, old_status, status)
+    publish_order_status(order)
+    
     return jsonify({'message': 'Order status updated!'})
 
 @bp.route('/users', methods=['GET'])
 @admin_required
+@db_timeout('ADMIN_QUERY_TIMEOUT')
 def admin_get_users(current_user):
     # Pagination
     page = int(request.args.get('page', 1))
@@ -75,12 +86,12 @@ def admin_get_users(current_user):
     skip = (page - 1) * limit
     
     # Get all users
-    users = list(get_db().users
+    users = list(get_db('analytics').users
         .find({}, {'password': 0})  # Exclude password
         .skip(skip)
         .limit(limit))
     
-    total = get_db().users.count_documents({})
+    total = get_db('analytics').users.count_documents({})
     
     # Convert ObjectId to string
     for user in users:
@@ -121,18 +132,23 @@ def update_user_role(current_user, user_id):
 
 @bp.route('/dashboard', methods=['GET'])
 @admin_required
+@db_timeout('ADMIN_QUERY_TIMEOUT')
 def admin_dashboard(current_user):
     # Get basic stats
-    total_products = get_db().products.count_documents({})
-    total_users = get_db().users.count_documents({})
-    total_orders = get_db().orders.count_documents({})
+    total_products = get_db('analytics').products.count_documents({})
+    total_users = get_db('analytics').users.count_documents({})
+    total_orders = count_orders({}, intent='analytics')
     
     # Get revenue stats
-    paid_orders = list(get_db().orders.find({'status': 'paid'}))
-    total_revenue = sum(order.get('totalAmount', 0) for order in paid_orders)
+    # (paid orders are never archived, so the hot collection is enough)
+    revenue = list(get_db('analytics').orders.aggregate([
+        {'$match': {'status': 'paid'}},
+        {'$group': {'_id': None, 'total': {'$sum': '$totalAmount'}}}
+    ]))
+    total_revenue = revenue[0]['total'] if revenue else 0
     
     # Get recent orders
-    recent_orders = list(get_db().orders
+    recent_orders = list(get_db('analytics').orders
         .find({})
         .sort('createdAt', -1)
         .limit(5))
@@ -144,13 +160,43 @@ def admin_dashboard(current_user):
     # Get order status distribution
     status_counts = {}
     for status in ['created', 'paid', 'shipped', 'delivered', 'cancelled']:
-        status_counts[status] = get_db().orders.count_documents({'status': status})
+        status_counts[status] = count_orders({'status': status}, intent='analytics')
     
     return jsonify({
         'totalProducts': total_products,
         'totalUsers': total_users,
         'totalOrders': total_orders,
         'totalRevenue': total_revenue,
-        'recentOrders': recentOrders,
+        'recentOrders': recent_orders,
         'orderStatusCounts': status_counts
+    })
+
+@bp.route('/analytics/sales', methods=['GET'])
+@admin_required
+@db_timeout('ADMIN_QUERY_TIMEOUT')
+def admin_sales_series(current_user):
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        return jsonify({'message': 'Invalid granularity!'}), 400
+    
+    breakdown = request.args.get('breakdown')
+    if breakdown and breakdown not in BREAKDOWNS:
+        return jsonify({'message': 'Invalid breakdown!'}), 400
+    
+    # Date range, defaulting to the last 30 days
+    try:
+        end = request.args.get('end')
+        end = datetime.datetime.fromisoformat(end) if end else datetime.datetime.utcnow()
+        start = request.args.get('start')
+        start = datetime.datetime.fromisoformat(start) if start else end - datetime.timedelta(days=30)
+    except ValueError:
+        return jsonify({'message': 'Invalid date!'}), 400
+    
+    series = get_sales_series(granularity, start, end, breakdown)
+    
+    return jsonify({
+        'granularity': granularity,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'series': series
     })
\ No newline at end of file
@@ -0,0 +1,64 @@
+from flask import Blueprint, request, jsonify, current_app
+from werkzeug.exceptions import HTTPException
+from urllib.parse import urlsplit
+
+bp = Blueprint('batch', __name__)
+
+# Batch itself and streaming endpoints
+UNBATCHABLE_PATHS = ['/api/batch', '/api/orders/events']
+
+def dispatch_subrequest(path):
+    """Run a GET sub-request inside the current application context.
+
+    The sub-request reuses the caller's Authorization header, and because
+    the app context (and with it ``g``) is shared, it also reuses the
+    database connection and the resolved user.
+    """
+    url = urlsplit(path)
+    headers = {}
+    if 'Authorization' in request.headers:
+        headers['Authorization'] = request.headers['Authorization']
+
+    with current_app.test_request_context(url.path, method='GET', query_string=url.query, headers=headers):
+        try:
+            rv = current_app.dispatch_request()
+        except HTTPException as e:
+            rv = jsonify({'message': e.description}), e.code
+        except Exception as e:
+            # One failing sub-request shouldn't fail the whole batch
+            current_app.logger.exception("Batch sub-request %s failed", path)
+            rv = jsonify({'message': 'Internal server error!', 'error': str(e)}), 500
+        response = current_app.make_response(rv)
+
+    # Streaming endpoints (e.g. order events) never finish, so don't read them
+    if response.is_streamed:
+        response.close()
+        return {'status': 400, 'body': {'message': 'Streaming endpoints cannot be batched!'}}
+
+    return {
+        'status': response.status_code,
+        'body': response.get_json(silent=True)
+    }
+
+@bp.route('', methods=['POST'])
+def batch():
+    """Run several read-only sub-requests in one round trip"""
+    data = request.get_json() or {}
+    subrequests = data.get('requests')
+
+    if not isinstance(subrequests, dict) or not subrequests:
+        return jsonify({'message': 'Requests are required!'}), 400
+
+    if len(subrequests) > current_app.config.get('MAX_BATCH_REQUESTS', 10):
+        return jsonify({'message': 'Too many requests!'}), 400
+
+    # Only API reads can be batched, batches can't nest and streams never end
+    for path in subrequests.values():
+        if not isinstance(path, str) or not path.startswith('/api/'):
+            return jsonify({'message': f'Invalid request path: {path}'}), 400
+        if urlsplit(path).path.rstrip('/') in UNBATCHABLE_PATHS:
+            return jsonify({'message': f'Invalid request path: {path}'}), 400
+
+    responses = {name: dispatch_subrequest(path) for name, path in subrequests.items()}
+
+    return jsonify({'responses': responses})
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from bson.objectid import ObjectId
 from utils.db import get_db
+from utils.cart_store import get_cart_store
 from utils.auth_middleware import token_required
 import datetime
 
@@ -9,7 +10,7 @@ bp = Blueprint('cart', __name__)
 @bp.route('', methods=['GET'])
 @token_required
 def get_cart(current_user):
-    cart = get_db().carts.find_one({'userId': str(current_user['_id'])})
+    cart = get_cart_store().get(str(current_user['_id']))
     
     if not cart:
         return jsonify({'items': [], 'total': 0})
@@ -19,7 +20,7 @@ def get_cart(current_user):
     # Calculate total
     total = 0
     for item in cart.get('items', []):
-        product = get_db().products.find_one({'_id': ObjectId(item['productId'])})
+        product = get_db('catalog').products.find_one({'_id': ObjectId(item['productId'])})
         if product:
             # Apply discount if available
             price = product['price']
@@ -42,12 +43,12 @@ def add_to_cart(current_user):
     color = data.get('color')
     
     # Validate product
-    product = get_db().products.find_one({'_id': ObjectId(product_id)})
+    product = get_db('catalog').products.find_one({'_id': ObjectId(product_id)})
     if not product:
         return jsonify({'message': 'Product not found!'}), 404
     
     # Check if user has a cart
-    cart = get_db().carts.find_one({'userId': str(current_user['_id'])})
+    cart = get_cart_store().get(str(current_user['_id']))
     
     if not cart:
         # Create new cart
@@ -62,7 +63,7 @@ def add_to_cart(current_user):
             'createdAt': datetime.datetime.utcnow(),
             'updatedAt': datetime.datetime.utcnow()
         }
-        get_db().carts.insert_one(cart)
+        get_cart_store().save(cart)
     else:
         # Check if product already in cart
         item_exists = False
@@ -85,15 +86,7 @@ def add_to_cart(current_user):
             })
         
         # Update cart
-        get_db().carts.update_one(
-            {'_id': cart['_id']},
-            {
-                '$set': {
-                    'items': cart['items'],
-                    'updatedAt': datetime.datetime.utcnow()
-                }
-            }
-        )
+        get_cart_store().save(cart)
     
     return jsonify({'message': 'Product added to cart!'})
 
@@ -108,7 +101,7 @@ def update_cart(current_user):
     color = data.get('color')
     
     # Get cart
-    cart = get_db().carts.find_one({'userId': str(current_user['_id'])})
+    cart = get_cart_store().get(str(current_user['_id']))
     
     if not cart:
         return jsonify({'message': 'Cart not found!'}), 404
@@ -126,15 +119,8 @@ def update_cart(current_user):
             updated_items.append(item)
     
     # Update cart
-    get_db().carts.update_one(
-        {'_id': cart['_id']},
-        {
-            '$set': {
-                'items': updated_items,
-                'updatedAt': datetime.datetime.utcnow()
-            }
-        }
-    )
+    cart['items'] = updated_items
+    get_cart_store().save(cart)
     
     return jsonify({'message': 'Cart updated!'})
 
@@ -148,7 +134,7 @@ def remove_from_cart(current_user):
     color = data.get('color')
     
     # Get cart
-    cart = get_db().carts.find_one({'userId': str(current_user['_id'])})
+    cart = get_cart_store().get(str(current_user['_id']))
     
     if not cart:
         return jsonify({'message': 'Cart not found!'}), 404
@@ -160,15 +146,8 @@ def remove_from_cart(current_user):
                             item.get('color') == color)]
     
     # Update cart
-    get_db().carts.update_one(
-        {'_id': cart['_id']},
-        {
-            '$set': {
-                'items': updated_items,
-                'updatedAt': datetime.datetime.utcnow()
-            }
-        }
-    )
+    cart['items'] = updated_items
+    get_cart_store().save(cart)
     
     return jsonify({'message': 'Item removed from cart!'})
 
@@ -176,15 +155,6 @@ def remove_from_cart(current_user):
 @token_required
 def clear_cart(current_user):
     # Clear the cart
-    get_db().carts.update_one(
-        {'userId': str(current_user['_id'])},
-        {
-            '$set': {
-                'items': [],
-                'updatedAt': datetime.datetime.utcnow()
-            }
-        },
-        upsert=True
-    )
+    get_cart_store().clear(str(current_user['_id']))
     
     return jsonify({'message': 'Cart cleared!'})
\ No newline at end of file
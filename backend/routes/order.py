@@ -1,60 +1,61 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response
 from bson.objectid import ObjectId
-from utils.db import get_db
-from utils.auth_middleware import token_required, admin_required
+from utils.db import get_db, query_timeout
+from utils.cart_store import get_cart_store
+from utils.auth_middleware import token_required, admin_required, get_user_for_token
+from utils.archive import find_order, find_orders, count_orders
+from utils.razorpay_utils import get_razorpay_client
+from utils.order_events import get_order_event_broker
+from utils.payment_events import mark_order_paid
+from utils.http_cache import not_modified, add_cache_headers, make_etag
 import datetime
-import razorpay
+import json
+import queue
 
 bp = Blueprint('orders', __name__)
 
-# Initialize Razorpay client lazily to avoid application context issues
-razorpay_client = None
-
-def get_razorpay_client():
-    global razorpay_client
-    if razorpay_client is None:
-        razorpay_client = razorpay.Client(
-            auth=(current_app.config['RAZORPAY_KEY_ID'], current_app.config['RAZORPAY_KEY_SECRET'])
-        )
-    return razorpay_client
-
 @bp.route('/create', methods=['POST'])
 @token_required
 def create_order(current_user):
     data = request.get_json()
     shipping_address = data.get('shippingAddress')
     
-    # Get user's cart
-    cart = get_db().carts.find_one({'userId': str(current_user['_id'])})
+    # The checkout timeout covers our MongoDB reads and writes only, not
+    # the Razorpay API call
+    with query_timeout('CHECKOUT_QUERY_TIMEOUT'):
+        # Get user's cart, flushing any pending cached writes first
+        get_cart_store().flush(str(current_user['_id']))
+        cart = get_cart_store().get(str(current_user['_id']))
     
-    if not cart or not cart.get('items'):
-        return jsonify({'message': 'Cart is empty!'}), 400
+        if not cart or not cart.get('items'):
+            return jsonify({'message': 'Cart is empty!'}), 400
     
-    # Process items and calculate total
-    order_items = []
-    total_amount = 0
+        # Process items and calculate total
+        order_items = []
+        total_amount = 0
     
-    for item in cart['items']:
-        product = get_db().products.find_one({'_id': ObjectId(item['productId'])})
-        if not product:
-            continue
+        for item in cart['items']:
+            product = get_db('transactional').products.find_one({'_id': ObjectId(item['productId'])})
+            if not product:
+                continue
         
-        # Calculate price with discount
-        price = product['price']
-        if product.get('discount'):
-            price = price - (price * product['discount'] / 100)
+            # Calculate price with discount
+            price = product['price']
+            if product.get('discount'):
+                price = price - (price * product['discount'] / 100)
         
-        order_items.append({
-            'productId': str(product['_id']),
-            'name': product['name'],
-            'price': price,
-            'quantity': item['quantity'],
-            'size': item.get('size'),
-            'color': item.get('color'),
-            'image': product.get('images', [])[0] if product.get('images') else None
-        })
+            order_items.append({
+                'productId': str(product['_id']),
+                'name': product['name'],
+                'price': price,
+                'quantity': item['quantity'],
+                'size': item.get('size'),
+                'color': item.get('color'),
+                'category': product.get('category'),
+                'image': product.get('images', [])[0] if product.get('images') else None
+            })
         
-        total_amount += price * item['quantity']
+            total_amount += price * item['quantity']
     
     # Create Razorpay order
     client = get_razorpay_client()
@@ -77,7 +78,8 @@ def create_order(current_user):
         'updatedAt': datetime.datetime.utcnow()
     }
     
-    result = get_db().orders.insert_one(order)
+    with query_timeout('CHECKOUT_QUERY_TIMEOUT'):
+        result = get_db('transactional').orders.insert_one(order)
     
     # Return order details and Razorpay order ID
     return jsonify({
@@ -107,33 +109,16 @@ def verify_payment(current_user):
     except Exception as e:
         return jsonify({'message': 'Invalid payment signature!', 'error': str(e)}), 400
     
-    # Update order status
-    order = get_db().orders.find_one({'razorpayOrderId': razorpay_order_id})
-    
-    if not order:
-        return jsonify({'message': 'Order not found!'}), 404
-    
-    get_db().orders.update_one(
-        {'_id': order['_id']},
-        {
-            '$set': {
-                'status': 'paid',
-                'paymentId': razorpay_payment_id,
-                'updatedAt': datetime.datetime.utcnow()
-            }
-        }
-    )
-    
-    # Clear cart
-    get_db().carts.update_one(
-        {'userId': str(current_user['_id'])},
-        {
-            '$set': {
-                'items': [],
-                'updatedAt': datetime.datetime.utcnow()
-            }
-        }
-    )
+    with query_timeout('CHECKOUT_QUERY_TIMEOUT'):
+        # Update order status
+        order = get_db('transactional').orders.find_one({'razorpayOrderId': razorpay_order_id})
+        
+        if not order:
+            return jsonify({'message': 'Order not found!'}), 404
+        
+        # Webhook events may already have marked the order paid, in which case
+        # this is a no-op
+        mark_order_paid(razorpay_order_id, razorpay_payment_id)
     
     return jsonify({
         'message': 'Payment successful!',
@@ -148,14 +133,10 @@ def get_orders(current_user):
     limit = int(request.args.get('limit', 10))
     skip = (page - 1) * limit
     
-    # Get user's orders
-    orders = list(get_db().orders
-        .find({'userId': str(current_user['_id'])})
-        .sort('createdAt', -1)
-        .skip(skip)
-        .limit(limit))
+    # Get user's orders (including archived ones)
+    orders = find_orders({'userId': str(current_user['_id'])}, skip, limit)
     
-    total = get_db().orders.count_documents({'userId': str(current_user['_id'])})
+    total = count_orders({'userId': str(current_user['_id'])})
     
     # Convert ObjectId to string
     for order in orders:
@@ -169,11 +150,63 @@ def get_orders(current_user):
         'pages': (total + limit - 1) // limit
     })
 
+@bp.route('/events', methods=['GET'])
+def order_events():
+    """Stream the user's order status changes as Server-Sent Events.
+
+    EventSource can't send headers, so the token may also be passed as
+    ``?token=``. Each open stream holds one idle worker greenlet or thread,
+    so large numbers of connections need an async worker (e.g. gevent).
+    """
+    token = request.args.get('token')
+    if 'Authorization' in request.headers:
+        token = request.headers['Authorization'].split(" ")[1]
+    
+    if not token:
+        return jsonify({'message': 'Token is missing!'}), 401
+    
+    try:
+        current_user = get_user_for_token(token)
+        if not current_user:
+            return jsonify({'message': 'User not found!'}), 401
+    except Exception as e:
+        return jsonify({'message': 'Token is invalid!', 'error': str(e)}), 401
+    
+    user_id = str(current_user['_id'])
+    broker = get_order_event_broker()
+    heartbeat = current_app.config.get('ORDER_EVENTS_HEARTBEAT', 15)
+    
+    def stream():
+        # Subscribe only once the stream starts, so a response that is never
+        # iterated (or is closed unread) never leaves a queue behind
+        subscriber = None
+        try:
+            subscriber = broker.subscribe(user_id)
+            yield f"retry: {heartbeat * 1000}\n\n"
+            while True:
+                try:
+                    event = subscriber.get(timeout=heartbeat)
+                except queue.Empty:
+                    # Comment line keeps proxies from closing idle streams
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            if subscriber is not None:
+                broker.unsubscribe(user_id, subscriber)
+    
+    # The stream only uses locals, so it runs without the request context;
+    # the context (and its MongoClient) is torn down as soon as we return
+    response = Response(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @bp.route('/<order_id>', methods=['GET'])
 @token_required
 def get_order(current_user, order_id):
     # Get order
-    order = get_db().orders.find_one({'_id': ObjectId(order_id)})
+    order = find_order({'_id': ObjectId(order_id)})
     
     if not order:
         return jsonify({'message': 'Order not found!'}), 404
@@ -182,6 +215,12 @@ def get_order(current_user, order_id):
     if order['userId'] != str(current_user['_id']) and current_user['role'] != 'admin':
         return jsonify({'message': 'Unauthorized!'}), 403
     
+    etag = make_etag('order', order_id, order.get('status'), order.get('updatedAt'))
+    cached = not_modified(etag, order.get('updatedAt'))
+    if cached:
+        return cached
+    
     order['_id'] = str(order['_id'])
     
-    return jsonify(order)
\ No newline at end of file
+    response = jsonify(order)
+    return add_cache_headers(response, etag, order.get('updatedAt'))
\ No newline at end of file
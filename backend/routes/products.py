@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify, current_app
 from bson.objectid import ObjectId
-from utils.db import get_db
+from utils.db import get_db, db_timeout
 from utils.auth_middleware import admin_required, token_required
+from utils.http_cache import not_modified, add_cache_headers, make_etag, get_catalog_version, bump_catalog_version
 import os
 from werkzeug.utils import secure_filename
 import datetime
@@ -13,8 +14,25 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
 
 @bp.route('', methods=['GET'])
+@db_timeout('CATALOG_QUERY_TIMEOUT')
 def get_products():
     """Get all products with optional filtering"""
+    # Listings are validated against the catalog version, so a matching
+    # client skips the query entirely
+    catalog_version, catalog_updated_at = get_catalog_version()
+    etag = make_etag('products', catalog_version, request.query_string.decode())
+    cached = not_modified(etag, catalog_updated_at, public=True)
+    if cached:
+        return cached
+    
+    # Batch lookup by ID
+    ids = request.args.get('ids')
+    if ids is not None:
+        response = get_products_by_ids(ids)
+        if isinstance(response, tuple):
+            return response
+        return add_cache_headers(response, etag, catalog_updated_at, public=True)
+    
     query = {}
     
     # Filter by category
@@ -42,7 +60,9 @@ def get_products():
     limit = int(request.args.get('limit', 10))
     skip = (page - 1) * limit
     
-    # Get products
+    # Get products. Listings are validated by the catalog version read from
+    # the primary, so they must be read from the primary too; a lagging
+    # secondary could serve an old body under the new ETag
     products = list(get_db().products.find(query).skip(skip).limit(limit))
     total = get_db().products.count_documents(query)
     
@@ -50,25 +70,57 @@ def get_products():
     for product in products:
         product['_id'] = str(product['_id'])
     
-    return jsonify({
+    response = jsonify({
         'products': products,
         'total': total,
         'page': page,
         'limit': limit,
         'pages': (total + limit - 1) // limit
     })
+    return add_cache_headers(response, etag, catalog_updated_at, public=True)
+
+def get_products_by_ids(ids):
+    """Get several products in one query, in the order they were requested"""
+    product_ids = [product_id for product_id in ids.split(',') if product_id]
+    
+    if len(product_ids) > current_app.config.get('MAX_BATCH_IDS', 100):
+        return jsonify({'message': 'Too many product IDs!'}), 400
+    
+    if not all(ObjectId.is_valid(product_id) for product_id in product_ids):
+        return jsonify({'message': 'Invalid product ID!'}), 400
+    
+    # Read from the primary, see get_products
+    products = get_db().products.find({'_id': {'$in': [ObjectId(product_id) for product_id in product_ids]}})
+    
+    # Convert ObjectId to string
+    found = {}
+    for product in products:
+        product['_id'] = str(product['_id'])
+        found[product['_id']] = product
+    
+    return jsonify({
+        'products': [found[product_id] for product_id in product_ids if product_id in found],
+        'missing': [product_id for product_id in product_ids if product_id not in found]
+    })
 
 @bp.route('/<product_id>', methods=['GET'])
+@db_timeout('CATALOG_QUERY_TIMEOUT')
 def get_product(product_id):
     """Get a product by ID"""
-    product = get_db().products.find_one({'_id': ObjectId(product_id)})
+    product = get_db('catalog').products.find_one({'_id': ObjectId(product_id)})
     
     if not product:
         return jsonify({'message': 'Product not found!'}), 404
     
+    etag = make_etag('product', product_id, product.get('updatedAt'))
+    cached = not_modified(etag, product.get('updatedAt'), public=True)
+    if cached:
+        return cached
+    
     product['_id'] = str(product['_id'])
     
-    return jsonify(product)
+    response = jsonify(product)
+    return add_cache_headers(response, etag, product.get('updatedAt'), public=True)
 
 @bp.route('', methods=['POST'])
 @admin_required
@@ -111,6 +163,7 @@ def create_product(current_user):
                 product['images'].append(f"/uploads/{unique_filename}")
     
     result = get_db().products.insert_one(product)
+    bump_catalog_version()
     
     return jsonify({
         'message': 'Product created successfully!',
@@ -162,6 +215,7 @@ def update_product(current_user, product_id):
         {'_id': ObjectId(product_id)},
         {'$set': product}
     )
+    bump_catalog_version()
     
     return jsonify({'message': 'Product updated successfully!'})
 
@@ -173,4 +227,6 @@ def delete_product(current_user, product_id):
     if result.deleted_count == 0:
         return jsonify({'message': 'Product not found!'}), 404
     
+    bump_catalog_version()
+    
     return jsonify({'message': 'Product deleted successfully!'})
\ No newline at end of file
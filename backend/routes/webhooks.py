@@ -0,0 +1,30 @@
+from flask import Blueprint, request, jsonify, current_app
+from utils.payment_events import verify_webhook_signature, store_event
+
+bp = Blueprint('webhooks', __name__)
+
+@bp.route('/razorpay', methods=['POST'])
+def razorpay_webhook():
+    """Receive a Razorpay webhook event.
+
+    The event is only verified and stored here; the payment worker
+    (``flask payment-worker``) applies it to the order, so Razorpay gets
+    its acknowledgement without waiting on order updates.
+    """
+    body = request.get_data()
+    signature = request.headers.get('X-Razorpay-Signature')
+
+    if not verify_webhook_signature(body, signature, current_app.config['RAZORPAY_WEBHOOK_SECRET']):
+        return jsonify({'message': 'Invalid webhook signature!'}), 400
+
+    payload = request.get_json(silent=True)
+    event_id = request.headers.get('X-Razorpay-Event-Id')
+
+    if not payload or not event_id:
+        return jsonify({'message': 'Invalid webhook event!'}), 400
+
+    # Razorpay retries deliveries, so repeats are acknowledged but not stored
+    if not store_event(event_id, payload):
+        return jsonify({'message': 'Event already received'})
+
+    return jsonify({'message': 'Event received'})
@@ -0,0 +1,207 @@
+import datetime
+import click
+from bson.objectid import ObjectId
+from pymongo import ASCENDING
+from utils.db import get_db
+
+# Orders in these statuses count as sales
+SOLD_STATUSES = ['paid', 'shipped', 'delivered']
+
+GRANULARITIES = ['hour', 'day']
+
+BREAKDOWNS = {
+    'product': 'products',
+    'category': 'categories',
+    'size': 'sizes',
+    'color': 'colors'
+}
+
+# Set once this process has created the rollup indexes
+_indexes_ready = False
+
+
+def bucket_start(timestamp, granularity):
+    if granularity == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _key(value):
+    # Field names can't contain '.' or start with '$'
+    if value is None or value == '':
+        return 'none'
+    return str(value).replace('.', '_').replace('$', '_')
+
+
+def _order_increments(order, sign):
+    """Build the $inc document for adding (sign=1) or removing (sign=-1) an order"""
+    inc = {
+        'revenue': sign * order.get('totalAmount', 0),
+        'orders': sign,
+        'units': 0
+    }
+    for item in order.get('items', []):
+        quantity = item.get('quantity', 0)
+        revenue = item.get('price', 0) * quantity
+        inc['units'] += sign * quantity
+        for field, value in (('products', item.get('productId')),
+                             ('categories', item.get('category')),
+                             ('sizes', item.get('size')),
+                             ('colors', item.get('color'))):
+            for metric, amount in (('units', quantity), ('revenue', revenue)):
+                path = f"{field}.{_key(value)}.{metric}"
+                inc[path] = inc.get(path, 0) + sign * amount
+    return inc
+
+
+def ensure_rollup_indexes():
+    """Create the unique bucket index, once per process"""
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    # Without it, two concurrent first upserts could create duplicate buckets
+    get_db().sales_rollups.create_index(
+        [('granularity', ASCENDING), ('start', ASCENDING)], unique=True
+    )
+    _indexes_ready = True
+
+
+def record_status_change(order, old_status, new_status):
+    """Update the hourly and daily rollups for an order status transition.
+
+    Sales are bucketed by the order's creation time, so a later
+    cancellation reverses the same buckets the sale was added to.
+    """
+    was_sold = old_status in SOLD_STATUSES
+    is_sold = new_status in SOLD_STATUSES
+    if was_sold == is_sold:
+        return
+
+    ensure_rollup_indexes()
+    _add_categories([order])
+    inc = _order_increments(order, 1 if is_sold else -1)
+    for granularity in GRANULARITIES:
+        get_db().sales_rollups.update_one(
+            {'granularity': granularity, 'start': bucket_start(order['createdAt'], granularity)},
+            {'$inc': inc},
+            upsert=True
+        )
+
+
+def _add_categories(orders):
+    # Orders created before items carried a category get it from the product
+    missing = {item['productId'] for order in orders for item in order.get('items', [])
+               if 'category' not in item and ObjectId.is_valid(item.get('productId', ''))}
+    if not missing:
+        return
+    products = get_db().products.find({'_id': {'$in': [ObjectId(pid) for pid in missing]}}, {'category': 1})
+    categories = {str(product['_id']): product.get('category') for product in products}
+    for order in orders:
+        for item in order.get('items', []):
+            item.setdefault('category', categories.get(item['productId']))
+
+
+def rebuild_rollups(since=None, batch_size=1000):
+    """Rebuild closed rollup buckets from historical orders (hot and archived).
+
+    Buckets for the current hour/day are left to live updates. A status
+    change to an older order made while the rebuild runs can still be
+    overwritten, so run it when order updates are quiet (or run it again).
+    """
+    ensure_rollup_indexes()
+    query = {'status': {'$in': SOLD_STATUSES}}
+    bucket_query = {}
+    if since is not None:
+        since = bucket_start(since, 'day')
+        query['createdAt'] = {'$gte': since}
+        bucket_query['start'] = {'$gte': since}
+
+    started_at = datetime.datetime.utcnow()
+    buckets = {}
+    for collection in (get_db().orders, get_db().orders_archive):
+        batch = []
+        for order in collection.find(query):
+            batch.append(order)
+            if len(batch) == batch_size:
+                _accumulate(buckets, batch)
+                batch = []
+        _accumulate(buckets, batch)
+
+    # Replace buckets in place rather than deleting and re-inserting, so
+    # live record_status_change upserts never hit a missing bucket. Buckets
+    # of the period the rebuild started in are skipped: new sales land
+    # there during the scan, and replacing them would drop those increments
+    rollups = get_db().sales_rollups
+    rebuilt = 0
+    for (granularity, start), counters in buckets.items():
+        if start >= bucket_start(started_at, granularity):
+            continue
+        doc = {'granularity': granularity, 'start': start}
+        for path, amount in counters.items():
+            # Expand dotted paths into nested documents
+            target = doc
+            *parents, leaf = path.split('.')
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = amount
+        rollups.replace_one({'granularity': granularity, 'start': start}, doc, upsert=True)
+        rebuilt += 1
+
+    # Drop closed buckets in range that no longer have any sales
+    stale = [bucket['_id'] for bucket in rollups.find(bucket_query, {'granularity': 1, 'start': 1})
+             if (bucket['granularity'], bucket['start']) not in buckets
+             and bucket['start'] < bucket_start(started_at, bucket['granularity'])]
+    if stale:
+        rollups.delete_many({'_id': {'$in': stale}})
+
+    return rebuilt
+
+
+def _accumulate(buckets, orders):
+    _add_categories(orders)
+    for order in orders:
+        inc = _order_increments(order, 1)
+        for granularity in GRANULARITIES:
+            counters = buckets.setdefault((granularity, bucket_start(order['createdAt'], granularity)), {})
+            for path, amount in inc.items():
+                counters[path] = counters.get(path, 0) + amount
+
+
+def get_sales_series(granularity, start, end, breakdown=None, intent='analytics'):
+    """Read the rollup buckets in [start, end) as a time series"""
+    projection = {'_id': 0, 'start': 1, 'revenue': 1, 'orders': 1, 'units': 1}
+    if breakdown:
+        projection[BREAKDOWNS[breakdown]] = 1
+
+    buckets = get_db(intent).sales_rollups.find(
+        {'granularity': granularity, 'start': {'$gte': start, '$lt': end}},
+        projection
+    ).sort('start', ASCENDING)
+
+    series = []
+    for bucket in buckets:
+        orders = bucket.get('orders', 0)
+        point = {
+            'start': bucket['start'].isoformat(),
+            'revenue': bucket.get('revenue', 0),
+            'orders': orders,
+            'units': bucket.get('units', 0),
+            'averageOrderValue': bucket.get('revenue', 0) / orders if orders else 0
+        }
+        if breakdown:
+            point[breakdown] = bucket.get(BREAKDOWNS[breakdown], {})
+        series.append(point)
+    return series
+
+
+def initialize_analytics(app):
+    """Register the rollup backfill CLI command"""
+
+    @app.cli.command('rebuild-rollups')
+    @click.option('--since', type=click.DateTime(), default=None, help='Only rebuild buckets from this date (UTC).')
+    def rebuild_rollups_command(since):
+        """Rebuild sales rollup buckets from historical orders."""
+        count = rebuild_rollups(since)
+        click.echo(f"Rebuilt {count} rollup buckets")
+
+    return app
@@ -0,0 +1,115 @@
+import datetime
+import heapq
+import itertools
+import click
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, ReplaceOne, DeleteOne
+from utils.db import get_db
+
+ARCHIVABLE_STATUSES = ['delivered', 'cancelled']
+
+
+def _hot(intent='default'):
+    return get_db(intent).orders
+
+
+def _archive(intent='default'):
+    return get_db(intent).orders_archive
+
+
+def find_order(query):
+    """Find one order, falling through to the archive"""
+    order = _hot().find_one(query)
+    if order is None:
+        order = _archive().find_one(query)
+    return order
+
+
+def count_orders(query, intent='default'):
+    """Count orders across the hot collection and the archive"""
+    return _hot(intent).count_documents(query) + _archive(intent).count_documents(query)
+
+
+def find_orders(query, skip=0, limit=10, intent='default'):
+    """List orders newest first across the hot collection and the archive.
+
+    Both cursors are sorted by createdAt, so merging them only reads
+    skip + limit documents from each side.
+    """
+    window = skip + limit
+    hot = _hot(intent).find(query).sort('createdAt', DESCENDING).limit(window)
+    archived = _archive(intent).find(query).sort('createdAt', DESCENDING).limit(window)
+    merged = heapq.merge(hot, archived, key=lambda order: order['createdAt'], reverse=True)
+    return list(itertools.islice(merged, skip, window))
+
+
+def update_order(query, update, return_document=ReturnDocument.AFTER):
+    """Update one order wherever it lives, returns the order (as of
+    ``return_document``) or None"""
+    order = _hot().find_one_and_update(query, update, return_document=return_document)
+    if order is None:
+        order = _archive().find_one_and_update(query, update, return_document=return_document)
+    return order
+
+
+def archive_orders(older_than_days, batch_size=500):
+    """Move delivered/cancelled orders not updated for older_than_days to the archive"""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=older_than_days)
+    query = {
+        'status': {'$in': ARCHIVABLE_STATUSES},
+        'updatedAt': {'$lt': cutoff}
+    }
+
+    moved = 0
+    while True:
+        batch = list(_hot().find(query).limit(batch_size))
+        if not batch:
+            break
+
+        # Copy first so a crash between the two steps never loses an order;
+        # re-running simply overwrites the archived copy
+        _archive().bulk_write([
+            ReplaceOne({'_id': order['_id']}, order, upsert=True) for order in batch
+        ], ordered=False)
+
+        # Only delete orders that weren't updated since they were copied
+        result = _hot().bulk_write([
+            DeleteOne({'_id': order['_id'], 'updatedAt': order['updatedAt']}) for order in batch
+        ], ordered=False)
+        moved += result.deleted_count
+
+        if result.deleted_count < len(batch):
+            # Orders updated in between stay hot; drop their stale copies.
+            # If they still qualify, a later pass copies them again
+            copied = {order['_id']: order['updatedAt'] for order in batch}
+            still_hot = _hot().find({'_id': {'$in': list(copied)}}, {'_id': 1})
+            stale = [DeleteOne({'_id': order['_id'], 'updatedAt': copied[order['_id']]}) for order in still_hot]
+            if stale:
+                _archive().bulk_write(stale, ordered=False)
+
+    return moved
+
+
+def ensure_order_indexes():
+    """Create the indexes used by order listings on both tiers"""
+    for collection in (_hot(), _archive()):
+        collection.create_index([('userId', ASCENDING), ('createdAt', DESCENDING)])
+        collection.create_index([('status', ASCENDING), ('createdAt', DESCENDING)])
+        collection.create_index([('createdAt', DESCENDING)])
+        collection.create_index('razorpayOrderId', sparse=True)
+    _hot().create_index([('status', ASCENDING), ('updatedAt', ASCENDING)])
+
+
+def initialize_archive(app):
+    """Register the order archival CLI commands"""
+
+    @app.cli.command('archive-orders')
+    @click.option('--days', type=int, default=None, help='Archive orders older than this many days.')
+    def archive_orders_command(days):
+        """Move old delivered/cancelled orders to the archive collection."""
+        if days is None:
+            days = app.config.get('ORDER_ARCHIVE_AFTER_DAYS', 90)
+        ensure_order_indexes()
+        moved = archive_orders(days, app.config.get('ORDER_ARCHIVE_BATCH_SIZE', 500))
+        click.echo(f"Archived {moved} orders older than {days} days")
+
+    return app
@@ -1,9 +1,19 @@
 import jwt
 from functools import wraps
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, g
 from utils.db import get_db
 from bson.objectid import ObjectId
 
+def get_user_for_token(token):
+    """Decode a token and load its user, once per application context"""
+    # Sub-requests of a composite request share the app context, so they
+    # share this cache and resolve the token only once
+    users = g.setdefault('auth_users', {})
+    if token not in users:
+        data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
+        users[token] = get_db().users.find_one({'_id': ObjectId(data['user_id'])})
+    return users[token]
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -15,8 +25,7 @@ def token_required(f):
             return jsonify({'message': 'Token is missing!'}), 401
         
         try:
-            data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
-            current_user = get_db().users.find_one({'_id': ObjectId(data['user_id'])})
+            current_user = get_user_for_token(token)
             
             if not current_user:
                 return jsonify({'message': 'User not found!'}), 401
@@ -39,8 +48,7 @@ def admin_required(f):
             return jsonify({'message': 'Token is missing!'}), 401
         
         try:
-            data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
-            current_user = get_db().users.find_one({'_id': ObjectId(data['user_id'])})
+            current_user = get_user_for_token(token)
             
             if not current_user:
                 return jsonify({'message': 'User not found!'}), 401
@@ -0,0 +1,266 @@
+import atexit
+import copy
+import datetime
+import fcntl
+import json
+import os
+import threading
+from bson.objectid import ObjectId
+from flask import current_app
+from pymongo import MongoClient
+from utils.db import get_db
+
+
+class DirectCartStore:
+    """Cart store that reads and writes straight to the carts collection"""
+
+    def __init__(self, collection_getter=None):
+        self._collection_getter = collection_getter or (lambda: get_db('transactional').carts)
+
+    def get(self, user_id):
+        return self._collection_getter().find_one({'userId': user_id})
+
+    def save(self, cart):
+        now = datetime.datetime.utcnow()
+        self._collection_getter().update_one(
+            {'userId': cart['userId']},
+            {
+                '$set': {
+                    'items': cart.get('items', []),
+                    'updatedAt': now
+                },
+                '$setOnInsert': {'createdAt': cart.get('createdAt', now)}
+            },
+            upsert=True
+        )
+
+    def clear(self, user_id):
+        self.save({'userId': user_id, 'items': []})
+
+    def flush(self, user_id=None):
+        return 0
+
+
+class CachedCartStore:
+    """In-memory cart cache with coalesced write-behind to MongoDB.
+
+    Writes only mark a cart dirty; a background thread flushes dirty carts
+    every ``flush_interval`` seconds. Only dirty carts are held in memory,
+    so reads of flushed carts always come from MongoDB. When a journal path
+    is given, every write is appended to it and fsynced before returning,
+    and the journal is replayed on startup so unflushed carts survive a
+    crash.
+
+    The cache is private to one process, so it must only be used by a
+    single web worker (see ``initialize_cart_store``).
+    """
+
+    def __init__(self, collection, flush_interval=5.0, journal_path=None):
+        self._collection = collection
+        self._flush_interval = flush_interval
+        self._journal_path = journal_path
+        self._lock = threading.RLock()
+        # Serializes whole flushes so an older snapshot can never be written
+        # after a newer one (e.g. background flush racing a checkout flush)
+        self._flush_lock = threading.Lock()
+        self._carts = {}
+        self._dirty = {}  # userId -> version
+        self._version = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._owner_lock = None
+
+        if journal_path:
+            self._replay_journal()
+
+    def get(self, user_id):
+        self.start()
+        with self._lock:
+            cart = self._carts.get(user_id)
+            if cart is not None:
+                return copy.deepcopy(cart)
+
+        return self._collection.find_one({'userId': user_id})
+
+    def save(self, cart):
+        cart = copy.deepcopy(cart)
+        now = datetime.datetime.utcnow()
+        cart.setdefault('_id', ObjectId())
+        cart.setdefault('createdAt', now)
+        cart['updatedAt'] = now
+
+        with self._lock:
+            self._version += 1
+            self._carts[cart['userId']] = cart
+            self._dirty[cart['userId']] = self._version
+            self._append_journal(cart)
+
+        self.start()
+
+    def clear(self, user_id):
+        cart = self.get(user_id) or {'userId': user_id}
+        cart['items'] = []
+        self.save(cart)
+
+    def flush(self, user_id=None):
+        """Write dirty carts to MongoDB, returns the number of carts written"""
+        with self._flush_lock:
+            with self._lock:
+                if user_id is not None:
+                    pending = {user_id: self._dirty[user_id]} if user_id in self._dirty else {}
+                else:
+                    pending = dict(self._dirty)
+                snapshot = {uid: copy.deepcopy(self._carts[uid]) for uid in pending}
+
+            for uid, cart in snapshot.items():
+                self._collection.update_one(
+                    {'userId': uid},
+                    {
+                        '$set': {
+                            'items': cart.get('items', []),
+                            'updatedAt': cart['updatedAt']
+                        },
+                        '$setOnInsert': {
+                            '_id': cart['_id'],
+                            'createdAt': cart['createdAt']
+                        }
+                    },
+                    upsert=True
+                )
+
+            with self._lock:
+                # Only drop carts that were not written again during the flush
+                for uid, version in pending.items():
+                    if self._dirty.get(uid) == version:
+                        del self._dirty[uid]
+                        del self._carts[uid]
+                self._compact_journal()
+
+            return len(snapshot)
+
+    def start(self):
+        # Threads don't survive fork, so a store created before a preforking
+        # server forks starts its own flusher in the worker
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._claim_journal()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='cart-store-flusher', daemon=True)
+                self._thread.start()
+
+    def _claim_journal(self):
+        # The only real multi-process check: an exclusive lock next to the
+        # journal that a second process on this host can't take. Without a
+        # journal there is nothing shared to detect
+        if not self._journal_path:
+            return
+        self._owner_lock = open(self._journal_path + '.lock', 'w')
+        try:
+            fcntl.flock(self._owner_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._owner_lock.close()
+            self._owner_lock = None
+            raise RuntimeError("Cart journal is in use by another process; the cart cache needs a single web worker")
+
+    def stop(self):
+        # Only the process running the flusher owns the cache and journal; a
+        # preforking master that never served requests must not touch them
+        if self._pid != os.getpid():
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self._flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                # Carts stay dirty (and journaled) and are retried next tick
+                print("Cart flush failed:", e)
+
+    def _append_journal(self, cart):
+        if not self._journal_path:
+            return
+        with open(self._journal_path, 'a') as f:
+            f.write(json.dumps(self._encode(cart)) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _compact_journal(self):
+        if not self._journal_path:
+            return
+        tmp_path = self._journal_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            for uid in self._dirty:
+                f.write(json.dumps(self._encode(self._carts[uid])) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._journal_path)
+
+    def _replay_journal(self):
+        if not os.path.exists(self._journal_path):
+            return
+        with open(self._journal_path) as f:
+            for line in f:
+                try:
+                    cart = self._decode(json.loads(line))
+                except ValueError:
+                    # Torn final line from a crash mid-write
+                    continue
+                self._version += 1
+                self._carts[cart['userId']] = cart
+                self._dirty[cart['userId']] = self._version
+
+    @staticmethod
+    def _encode(cart):
+        return {
+            '_id': str(cart['_id']),
+            'userId': cart['userId'],
+            'items': cart.get('items', []),
+            'createdAt': cart['createdAt'].isoformat(),
+            'updatedAt': cart['updatedAt'].isoformat()
+        }
+
+    @staticmethod
+    def _decode(data):
+        return {
+            '_id': ObjectId(data['_id']),
+            'userId': data['userId'],
+            'items': data.get('items', []),
+            'createdAt': datetime.datetime.fromisoformat(data['createdAt']),
+            'updatedAt': datetime.datetime.fromisoformat(data['updatedAt'])
+        }
+
+
+def get_cart_store():
+    """Get the cart store for the current app"""
+    return current_app.extensions['cart_store']
+
+
+def initialize_cart_store(app):
+    """Initialize the cart store (cached when CART_CACHE_ENABLED is set)"""
+    if app.config.get('CART_CACHE_ENABLED'):
+        # Each process would cache (and journal) its own copy of a cart, and
+        # writes from different workers would overwrite each other. This only
+        # checks the configured value: a worker count set any other way (e.g.
+        # gunicorn -w) isn't visible here. With CART_JOURNAL_PATH set, a
+        # second worker is also caught by the journal lock on first use
+        if app.config.get('WEB_CONCURRENCY', 1) != 1:
+            raise RuntimeError("CART_CACHE_ENABLED requires a single web worker (WEB_CONCURRENCY=1)")
+
+        client = MongoClient(app.config['MONGO_URI'])
+        store = CachedCartStore(
+            client.get_default_database().carts,
+            flush_interval=app.config.get('CART_FLUSH_INTERVAL', 5.0),
+            journal_path=app.config.get('CART_JOURNAL_PATH') or None
+        )
+        atexit.register(store.stop)
+    else:
+        store = DirectCartStore()
+
+    app.extensions['cart_store'] = store
+    return app
@@ -0,0 +1,159 @@
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+from flask import request
+
+# Optional codecs, used only when installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'text/html',
+    'text/plain',
+    'text/css',
+    'application/javascript'
+}
+
+
+def _available_encodings():
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    encodings.append('gzip')
+    return encodings
+
+
+def choose_encoding(accept_encodings):
+    """Pick the best supported encoding the client accepts, or None"""
+    best = None
+    best_quality = 0
+    for encoding in _available_encodings():
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, level):
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=min(level, 9))
+
+
+def _stream_compressor(encoding, level):
+    # Returns (compress_chunk, flush, finish) callables for incremental
+    # compression; flush emits everything compressed so far
+    if encoding == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        return (compressor.compress,
+                lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+                compressor.flush)
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=min(level, 11))
+        return compressor.process, compressor.flush, compressor.finish
+    compressor = zlib.compressobj(min(level, 9), zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return (compressor.compress,
+            lambda: compressor.flush(zlib.Z_SYNC_FLUSH),
+            compressor.flush)
+
+
+def compress_stream(chunks, encoding, level):
+    """Compress an iterable of chunks without buffering the whole body.
+
+    Each chunk is sync-flushed so the client receives it as soon as it is
+    produced, as it would uncompressed.
+    """
+    compress_chunk, flush, finish = _stream_compressor(encoding, level)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        data = compress_chunk(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressedBodyCache:
+    """Small LRU of compressed bodies keyed by (ETag, encoding)"""
+
+    def __init__(self, max_entries=256):
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def set(self, key, body):
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+def initialize_compression(app):
+    """Register negotiated response compression"""
+    min_size = app.config.get('COMPRESS_MIN_SIZE', 500)
+    level = app.config.get('COMPRESS_LEVEL', 6)
+    body_cache = CompressedBodyCache(app.config.get('COMPRESS_CACHE_ENTRIES', 256))
+
+    @app.after_request
+    def compress_response(response):
+        if not app.config.get('COMPRESS_ENABLED', True):
+            return response
+
+        if (response.status_code < 200 or response.status_code in (204, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        # Generator responses are compressed chunk by chunk
+        if response.is_streamed:
+            response.response = compress_stream(response.response, encoding, level)
+            response.headers['Content-Encoding'] = encoding
+            response.headers.pop('Content-Length', None)
+            return response
+
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        # Reuse compressed bytes of publicly cacheable bodies
+        etag, _ = response.get_etag()
+        cacheable = etag and response.cache_control.public
+        key = (etag, encoding)
+        body = body_cache.get(key) if cacheable else None
+        if body is None:
+            body = compress(data, encoding, level)
+            if cacheable:
+                body_cache.set(key, body)
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    return app
@@ -1,15 +1,79 @@
-from pymongo import MongoClient
+import click
+import pymongo
+from contextlib import contextmanager
+from functools import wraps
+from pymongo import MongoClient, ReadPreference
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import SecondaryPreferred
+from pymongo.write_concern import WriteConcern
 from flask import g, current_app
 
-def get_db():
-    """Get database connection"""
+# Query intents:
+#   default       - client defaults (primary reads)
+#   transactional - checkout paths: primary reads, majority reads and writes
+#   catalog       - public product reads, may lag behind the primary
+#   analytics     - admin listings and reports, may lag behind the primary
+INTENTS = ('default', 'transactional', 'catalog', 'analytics')
+
+def _intent_options(intent):
+    if intent == 'transactional':
+        return {
+            'read_preference': ReadPreference.PRIMARY,
+            'read_concern': ReadConcern('majority'),
+            'write_concern': WriteConcern(w='majority')
+        }
+    if intent in ('catalog', 'analytics'):
+        # max_staleness must be at least 90 seconds
+        max_staleness = max(current_app.config.get('DB_MAX_STALENESS_SECONDS', 90), 90)
+        return {'read_preference': SecondaryPreferred(max_staleness=max_staleness)}
+    return {}
+
+def get_db(intent='default'):
+    """Get database connection, configured for the given query intent"""
+    if intent not in INTENTS:
+        raise ValueError(f"Unknown query intent: {intent}")
     if 'db' not in g:
         g.client = MongoClient(current_app.config['MONGO_URI'])
         g.db = g.client.get_default_database()
-    return g.db
+    if intent == 'default':
+        return g.db
+
+    # Intent views share the connection pool of the default database
+    dbs = g.setdefault('intent_dbs', {})
+    if intent not in dbs:
+        dbs[intent] = g.db.with_options(**_intent_options(intent))
+    return dbs[intent]
+
+@contextmanager
+def query_timeout(config_key):
+    """Limit the total time the enclosed MongoDB operations may take.
+
+    The limit (in seconds) is read from ``config_key``; operations that run
+    past it raise a timeout error instead of piling up behind each other.
+    The deadline runs on wall-clock time, so keep other slow calls (e.g.
+    payment gateway requests) outside the block.
+    """
+    seconds = current_app.config.get(config_key)
+    if not seconds:
+        yield
+        return
+    with pymongo.timeout(seconds):
+        yield
+
+def db_timeout(config_key):
+    """Run a whole route under query_timeout(config_key)"""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            with query_timeout(config_key):
+                return f(*args, **kwargs)
+        return decorated
+    return decorator
 
 def close_db(e=None):
     """Close database connection"""
+    g.pop('intent_dbs', None)
+    g.pop('db', None)
     client = g.pop('client', None)
     if client is not None:
         client.close()
@@ -17,4 +81,14 @@ def close_db(e=None):
 def initialize_db(app):
     """Initialize database connection"""
     app.teardown_appcontext(close_db)
-    return app
\ No newline at end of file
+
+    @app.cli.command('db-intents')
+    def db_intents_command():
+        """Show which replica set member serves reads for each query intent."""
+        for intent in INTENTS:
+            cursor = get_db(intent).products.find({}, {'_id': 1}).limit(1)
+            list(cursor)
+            host, port = cursor.address
+            click.echo(f"{intent:14} {get_db(intent).read_preference.name:20} {host}:{port}")
+
+    return app
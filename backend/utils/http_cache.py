@@ -0,0 +1,77 @@
+import datetime
+import hashlib
+from flask import request, current_app, Response
+from utils.db import get_db
+
+
+def make_etag(*parts):
+    """Build an ETag value from the given parts"""
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return digest[:32]
+
+
+def _http_date(value):
+    # HTTP dates have second precision and Mongo stores naive UTC datetimes
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def _cache_control(public):
+    if public:
+        max_age = current_app.config.get('CATALOG_CACHE_MAX_AGE', 60)
+        return f"public, max-age={max_age}"
+    # Private data must be revalidated on every use
+    return "private, no-cache"
+
+
+def not_modified(etag, last_modified=None, public=False):
+    """Return a 304 response if the request's validators match, else None"""
+    last_modified = _http_date(last_modified)
+
+    # If-None-Match takes precedence over If-Modified-Since
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified is not None:
+        matched = last_modified <= request.if_modified_since
+    else:
+        matched = False
+
+    if not matched:
+        return None
+
+    response = Response(status=304)
+    return add_cache_headers(response, etag, last_modified, public)
+
+
+def add_cache_headers(response, etag, last_modified=None, public=False):
+    """Attach ETag, Last-Modified and Cache-Control headers to a response"""
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = _http_date(last_modified)
+    response.headers['Cache-Control'] = _cache_control(public)
+    if not public:
+        response.vary.add('Authorization')
+    return response
+
+
+def get_catalog_version():
+    """Get the catalog version counter used to validate product listings"""
+    meta = get_db().meta.find_one({'_id': 'catalog'})
+    if not meta:
+        return 0, None
+    return meta.get('version', 0), meta.get('updatedAt')
+
+
+def bump_catalog_version():
+    """Invalidate cached product listings after a catalog change"""
+    get_db().meta.update_one(
+        {'_id': 'catalog'},
+        {
+            '$inc': {'version': 1},
+            '$set': {'updatedAt': datetime.datetime.utcnow()}
+        },
+        upsert=True
+    )
@@ -0,0 +1,136 @@
+import os
+import queue
+import threading
+import time
+from flask import current_app
+from pymongo import MongoClient
+
+
+class OrderEventBroker:
+    """In-process pub/sub of order status changes, keyed by userId.
+
+    Each subscriber gets a bounded queue. When a slow client lets its queue
+    fill up, its pending events are replaced by a single ``resync`` event
+    telling it to refetch, so one stalled connection never holds memory
+    or blocks publishers.
+    """
+
+    def __init__(self, max_queue_size=100, feed=None):
+        self._max_queue_size = max_queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._feed = feed
+        self._feed_pid = None
+
+    def subscribe(self, user_id):
+        self._start_feed()
+        subscriber = queue.Queue(maxsize=self._max_queue_size)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                self._overflow(subscriber)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def _start_feed(self):
+        # Started on first use (and again after a fork) so each worker of a
+        # preforking server runs its own feed thread
+        if self._feed is None or self._feed_pid == os.getpid():
+            return
+        with self._lock:
+            if self._feed_pid == os.getpid():
+                return
+            self._feed_pid = os.getpid()
+        thread = threading.Thread(target=self._feed, args=(self,), name='order-events-feed', daemon=True)
+        thread.start()
+
+    @staticmethod
+    def _overflow(subscriber):
+        # Drop the backlog and ask the client to refetch its orders
+        try:
+            while True:
+                subscriber.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            subscriber.put_nowait({'type': 'resync'})
+        except queue.Full:
+            pass
+
+
+def watch_order_changes(broker, mongo_uri):
+    """Feed the broker from a MongoDB change stream (requires a replica set).
+
+    Lets every worker see status changes made by any other worker.
+    """
+    client = MongoClient(mongo_uri)
+    pipeline = [{
+        '$match': {
+            'operationType': 'update',
+            'updateDescription.updatedFields.status': {'$exists': True}
+        }
+    }]
+    while True:
+        try:
+            with client.get_default_database().orders.watch(pipeline, full_document='updateLookup') as stream:
+                for change in stream:
+                    order = change.get('fullDocument')
+                    if order:
+                        broker.publish(order['userId'], order_status_event(order))
+        except Exception as e:
+            print("Order change stream failed, restarting:", e)
+            time.sleep(1)
+
+
+def order_status_event(order):
+    return {
+        'type': 'status',
+        'orderId': str(order['_id']),
+        'status': order['status'],
+        'updatedAt': order['updatedAt'].isoformat() if order.get('updatedAt') else None
+    }
+
+
+def publish_order_status(order):
+    """Announce an order's new status to its owner's open event streams"""
+    # With a change stream the event arrives from MongoDB instead, which
+    # also covers writes made by other workers
+    if current_app.config.get('ORDER_EVENTS_BACKEND', 'local') == 'local':
+        get_order_event_broker().publish(order['userId'], order_status_event(order))
+
+
+def get_order_event_broker():
+    """Get the order event broker for the current app"""
+    return current_app.extensions['order_events']
+
+
+def initialize_order_events(app):
+    """Initialize the order event broker and, if configured, its change stream feed"""
+    feed = None
+    if app.config.get('ORDER_EVENTS_BACKEND', 'local') == 'changestream':
+        mongo_uri = app.config['MONGO_URI']
+        feed = lambda broker: watch_order_changes(broker, mongo_uri)
+
+    broker = OrderEventBroker(app.config.get('ORDER_EVENTS_QUEUE_SIZE', 100), feed)
+
+    app.extensions['order_events'] = broker
+    return app
@@ -0,0 +1,222 @@
+import datetime
+import hashlib
+import hmac
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import click
+from flask import current_app
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from utils.db import get_db
+from utils.cart_store import get_cart_store
+from utils.analytics import record_status_change
+from utils.order_events import publish_order_status
+
+# Webhook events that confirm an order was paid
+PAID_EVENTS = ['payment.captured', 'order.paid']
+
+
+def verify_webhook_signature(body, signature, secret):
+    """Check the X-Razorpay-Signature HMAC of a raw webhook body"""
+    if not signature or not secret:
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def _razorpay_order_id(payload):
+    entities = payload.get('payload', {})
+    order = entities.get('order', {}).get('entity', {})
+    payment = entities.get('payment', {}).get('entity', {})
+    return order.get('id') or payment.get('order_id'), payment.get('id')
+
+
+def store_event(event_id, payload):
+    """Append a raw webhook event, returns False if it was already received"""
+    razorpay_order_id, payment_id = _razorpay_order_id(payload)
+    try:
+        get_db('transactional').payment_events.insert_one({
+            '_id': event_id,
+            'event': payload.get('event'),
+            'razorpayOrderId': razorpay_order_id,
+            'paymentId': payment_id,
+            'createdAt': payload.get('created_at'),
+            'payload': payload,
+            'state': 'pending',
+            'receivedAt': datetime.datetime.utcnow()
+        })
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+def mark_order_paid(razorpay_order_id, payment_id):
+    """Move a created order to paid, returns the paid order or None.
+
+    The update only matches orders still in 'created', so the webhook and
+    the client's verify call can both report the same payment safely.
+    """
+    updated_at = datetime.datetime.utcnow()
+    order = get_db('transactional').orders.find_one_and_update(
+        {'razorpayOrderId': razorpay_order_id, 'status': 'created'},
+        {
+            '$set': {
+                'status': 'paid',
+                'paymentId': payment_id,
+                'updatedAt': updated_at
+            }
+        },
+        return_document=ReturnDocument.AFTER
+    )
+    if order is None:
+        return None
+
+    record_status_change(order, 'created', 'paid')
+    publish_order_status(order)
+
+    # Clear cart
+    get_cart_store().clear(order['userId'])
+    get_cart_store().flush(order['userId'])
+    return order
+
+
+def _apply_event(event):
+    if event['event'] in PAID_EVENTS and event.get('razorpayOrderId'):
+        mark_order_paid(event['razorpayOrderId'], event.get('paymentId'))
+        return 'applied'
+    return 'ignored'
+
+
+def _claim_events(batch_size, claim_timeout):
+    events = get_db('transactional').payment_events
+    now = datetime.datetime.utcnow()
+    claimable = {
+        '$or': [
+            # Retries wait until their backoff has passed
+            {'state': 'pending', 'nextAttemptAt': {'$not': {'$gt': now}}},
+            # Claims from workers that died mid-batch
+            {'state': 'processing', 'claimedAt': {'$lt': now - datetime.timedelta(seconds=claim_timeout)}}
+        ]
+    }
+    ids = [event['_id'] for event in events.find(claimable, {'_id': 1}).sort('receivedAt', ASCENDING).limit(batch_size)]
+    if not ids:
+        return []
+
+    # Another worker may claim some of the same events first; we only get
+    # the ones our update matched
+    claim_id = uuid.uuid4().hex
+    events.update_many(
+        {'_id': {'$in': ids}, **claimable},
+        {'$set': {'state': 'processing', 'claimId': claim_id, 'claimedAt': now}}
+    )
+    return list(events.find({'claimId': claim_id}))
+
+
+def _retry_delay(attempts):
+    # Exponential backoff, capped at PAYMENT_WORKER_MAX_BACKOFF
+    base = current_app.config.get('PAYMENT_WORKER_RETRY_BACKOFF', 5.0)
+    return min(base * 2 ** (attempts - 1), current_app.config.get('PAYMENT_WORKER_MAX_BACKOFF', 3600.0))
+
+
+def _apply_partition(events):
+    collection = get_db('transactional').payment_events
+    max_attempts = current_app.config.get('PAYMENT_WORKER_MAX_ATTEMPTS', 10)
+    # Orders with a failed event this batch -> its next attempt; their later
+    # events wait until then too, so one order's events stay in order
+    deferred = {}
+
+    for event in events:
+        now = datetime.datetime.utcnow()
+        order_key = event.get('razorpayOrderId') or event['_id']
+        if order_key in deferred:
+            collection.update_one(
+                {'_id': event['_id']},
+                {'$set': {'state': 'pending', 'nextAttemptAt': deferred[order_key]}}
+            )
+            continue
+
+        try:
+            update = {'state': _apply_event(event), 'error': None, 'processedAt': now}
+        except Exception as e:
+            # Transient errors (timeouts, stepdowns, network) must not lose
+            # a captured payment, so retry with backoff before giving up
+            attempts = event.get('attempts', 0) + 1
+            update = {'attempts': attempts, 'error': str(e)}
+            if attempts >= max_attempts:
+                update.update({'state': 'failed', 'processedAt': now})
+            else:
+                next_attempt_at = now + datetime.timedelta(seconds=_retry_delay(attempts))
+                deferred[order_key] = next_attempt_at
+                update.update({'state': 'pending', 'nextAttemptAt': next_attempt_at})
+        collection.update_one({'_id': event['_id']}, {'$set': update})
+
+
+def create_worker_pool(app, threads=4):
+    """Create the thread pool used by process_events.
+
+    Each thread keeps an application context open for its lifetime, so
+    it reuses one database connection across batches.
+    """
+    return ThreadPoolExecutor(max_workers=threads, initializer=lambda: app.app_context().push())
+
+
+def process_events(pool, threads, batch_size=200, claim_timeout=60):
+    """Claim one batch of pending events and apply them, returns the batch size.
+
+    Events are partitioned by Razorpay order ID across the thread pool, so
+    events for the same order are applied in order by a single thread.
+    """
+    batch = _claim_events(batch_size, claim_timeout)
+    if not batch:
+        return 0
+
+    partitions = [[] for _ in range(threads)]
+    for event in sorted(batch, key=lambda e: (e.get('createdAt') or 0, e['receivedAt'])):
+        key = (event.get('razorpayOrderId') or event['_id']).encode()
+        partitions[zlib.crc32(key) % threads].append(event)
+
+    list(pool.map(_apply_partition, [partition for partition in partitions if partition]))
+
+    return len(batch)
+
+
+def initialize_payment_events(app):
+    """Register the payment event worker CLI command"""
+
+    @app.cli.command('payment-worker')
+    @click.option('--once', is_flag=True, help='Process one batch and exit.')
+    def payment_worker_command(once):
+        """Apply stored Razorpay webhook events to orders.
+
+        The worker runs in its own process, so it can only clear carts
+        through the direct cart store and can only reach SSE clients in the
+        web workers through the change-stream event backend.
+        """
+        # A cached cart store here would clear this process's copy while
+        # the web worker keeps serving (and flushing) the full cart
+        if app.config.get('CART_CACHE_ENABLED'):
+            raise click.UsageError("payment-worker requires CART_CACHE_ENABLED=False")
+        # Locally published events would never leave this process
+        if app.config.get('ORDER_EVENTS_BACKEND', 'local') != 'changestream':
+            raise click.UsageError("payment-worker requires ORDER_EVENTS_BACKEND=changestream")
+
+        events = get_db().payment_events
+        events.create_index([('state', ASCENDING), ('receivedAt', ASCENDING)])
+        events.create_index([('state', ASCENDING), ('nextAttemptAt', ASCENDING)])
+        events.create_index('razorpayOrderId')
+
+        batch_size = app.config.get('PAYMENT_WORKER_BATCH_SIZE', 200)
+        threads = app.config.get('PAYMENT_WORKER_THREADS', 4)
+        pool = create_worker_pool(app, threads)
+        while True:
+            processed = process_events(pool, threads, batch_size)
+            if processed:
+                click.echo(f"Processed {processed} payment events")
+            if once:
+                break
+            if processed < batch_size:
+                time.sleep(app.config.get('PAYMENT_WORKER_POLL_INTERVAL', 1.0))
+
+    return app
@@ -0,0 +1,20 @@
+from flask import current_app
+
+# Initialize Razorpay client lazily to avoid application context issues.
+# The SDK (and its requests stack) is imported on first use so workers that
+# never serve checkout don't pay for it at startup.
+razorpay_client = None
+
+def get_razorpay_client():
+    global razorpay_client
+    if razorpay_client is None:
+        import razorpay
+        razorpay_client = razorpay.Client(
+            auth=(current_app.config['RAZORPAY_KEY_ID'], current_app.config['RAZORPAY_KEY_SECRET'])
+        )
+    return razorpay_client
+
+def preload():
+    """Import the Razorpay SDK ahead of time (for forking servers)"""
+    import razorpay
+    return razorpay